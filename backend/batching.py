@@ -0,0 +1,87 @@
+"""Micro-batching of encoder calls for concurrent chat requests."""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+def bucket_by_length(lengths: Sequence[int], bounds: Sequence[int]) -> Dict[int, List[int]]:
+    """Group positions by the smallest bound their length fits under.
+
+    bounds must be ascending and the last one at least max(lengths).
+    """
+    buckets: Dict[int, List[int]] = {}
+    for i, length in enumerate(lengths):
+        bound = next(b for b in bounds if length <= b)
+        buckets.setdefault(bound, []).append(i)
+    return buckets
+
+class EmbeddingBatcher:
+    """Dynamic micro-batcher for the encoder.
+
+    Concurrent requests are queued and encoded together once either
+    max_batch_size messages are waiting or max_wait seconds have passed
+    since the first one arrived. encode_batch takes a list of texts and
+    returns one embedding per text, in order; it runs in the default
+    executor so the event loop keeps accepting requests meanwhile.
+
+    The worker task belongs to one event loop: start() and stop() are
+    meant for the app's startup and shutdown, and encode() starts a fresh
+    worker if there is none running on the current loop.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], Any], max_batch_size: int, max_wait: float):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._queue, self._worker = None, None
+
+    async def encode(self, text: str) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self.start()
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Encode off the event loop so new requests keep queueing meanwhile
+            try:
+                embeddings = await loop.run_in_executor(None, self.encode_batch, [text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"Error encoding batch: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
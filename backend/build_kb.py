@@ -0,0 +1,83 @@
+"""Precompute the knowledge base embeddings so API workers skip encoding at startup.
+
+Writes kb.npy (knowledge base rows followed by the fallback answers, L2
+normalized float32) and kb.json (what they were built from) next to
+main.py. Each API worker loads kb.npy at startup instead of running the
+encoder over the whole knowledge base; the embeddings are small, so every
+worker still keeps its own copy on DEVICE (and an int8 one for SimSIMD).
+A worker re-encodes in-process if kb.json no longer matches the encoder
+settings (MODEL_NAME or the TEI model, backend, ONNX file, dtype,
+sequence lengths) or knowledge.py. Rerun after changing any of them.
+
+It also logs how often the API's own scoring (fp16 on GPU, int8 with
+SimSIMD on CPU) picks the same answer as float32 for the sample queries in
+knowledge.py; test_ranking.py is what enforces it.
+
+Usage:
+    python build_kb.py
+"""
+import json
+import logging
+import os
+import sys
+from typing import Tuple
+
+import numpy as np
+import torch
+
+from knowledge import SAMPLE_QUERIES
+from main import (
+    DEVICE,
+    KB_EMBEDDINGS_FILE,
+    KB_METADATA_FILE,
+    KB_TEXTS,
+    encode_texts,
+    find_most_relevant_response,
+    kb_embeddings,
+    knowledge_base_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+def ranking_agreement(embeddings: np.ndarray, margin: float = 0.0) -> Tuple[int, int]:
+    """Count sample queries for which find_most_relevant_response picks the float32 best answer.
+
+    Queries whose two best float32 scores are closer than margin are near
+    ties that rounding may legitimately flip, and are left out. Returns
+    (agreeing, checked).
+    """
+    kb = torch.tensor(np.asarray(embeddings[:len(KB_TEXTS)]), dtype=torch.float32, device=DEVICE)
+    queries = encode_texts(SAMPLE_QUERIES)
+    top_scores, top_indices = (queries @ kb.T).topk(2, dim=1)
+    agreeing = checked = 0
+    for query, embedding, (best, second), (reference, _) in zip(
+        SAMPLE_QUERIES, queries, top_scores.tolist(), top_indices.tolist()
+    ):
+        if best - second < margin:
+            continue
+        checked += 1
+        response, _, _ = find_most_relevant_response(query, message_embedding=embedding)
+        agreeing += response == KB_TEXTS[reference]
+    return agreeing, checked
+
+def main() -> int:
+    # Importing main already loaded or encoded the knowledge base for the
+    # current settings; copy it out of any memory map before replacing files
+    embeddings = np.array(kb_embeddings, dtype=np.float32)
+    
+    agreeing, checked = ranking_agreement(embeddings)
+    logger.info(f"Serving scores pick the float32 answer for {agreeing} of {checked} sample queries")
+    
+    # Write to temporary files and rename, so running workers that have the
+    # old kb.npy mapped keep reading a complete file
+    with open(KB_EMBEDDINGS_FILE + ".tmp", "wb") as f:
+        np.save(f, embeddings)
+    os.replace(KB_EMBEDDINGS_FILE + ".tmp", KB_EMBEDDINGS_FILE)
+    with open(KB_METADATA_FILE + ".tmp", "w") as f:
+        json.dump(knowledge_base_metadata(), f, indent=2)
+    os.replace(KB_METADATA_FILE + ".tmp", KB_METADATA_FILE)
+    logger.info(f"Wrote {embeddings.shape[0]} embeddings to {KB_EMBEDDINGS_FILE}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Response cache used in front of the knowledge base search."""
+from collections import OrderedDict
+from typing import List, Optional
+
+import torch
+
+class ResponseCache:
+    """Two-tier LRU cache of generated responses.
+
+    Lookups first try an exact match on the normalized message, then a
+    semantic match against the embeddings of previously answered messages.
+    Embeddings are stored as dtype; a maxsize of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int, threshold: float, dtype: torch.dtype = torch.float32):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.dtype = dtype
+        self._slots: "OrderedDict[str, int]" = OrderedDict()  # key -> slot, in LRU order
+        self._keys: List[str] = []
+        self._responses: List[str] = []
+        self._embeddings: Optional[torch.Tensor] = None  # (maxsize, d), filled lazily
+
+    def get(self, key: str) -> Optional[str]:
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        self._slots.move_to_end(key)
+        return self._responses[slot]
+
+    def get_similar(self, embedding: torch.Tensor) -> Optional[str]:
+        if not self._responses:
+            return None
+        similarities = (self._embeddings[:len(self._responses)] @ embedding.to(self.dtype)).float()
+        score, slot = similarities.max(dim=0)
+        # One host sync for both values; slot numbers are exact in float32
+        score, slot = torch.stack((score, slot.to(score.dtype))).tolist()
+        if score < self.threshold:
+            return None
+        slot = int(slot)
+        self._slots.move_to_end(self._keys[slot])
+        return self._responses[slot]
+
+    def put(self, key: str, embedding: torch.Tensor, response: str) -> None:
+        if self.maxsize <= 0:
+            return
+        if self._embeddings is None:
+            self._embeddings = embedding.new_empty((self.maxsize, embedding.shape[-1]), dtype=self.dtype)
+        if key in self._slots:
+            slot = self._slots[key]
+        elif len(self._responses) < self.maxsize:
+            slot = len(self._responses)
+            self._keys.append(key)
+            self._responses.append(response)
+        else:
+            # Evict the least recently used entry and reuse its slot
+            _, slot = self._slots.popitem(last=False)
+        self._slots[key] = slot
+        self._slots.move_to_end(key)
+        self._keys[slot] = key
+        self._responses[slot] = response
+        self._embeddings[slot] = embedding
@@ -0,0 +1,135 @@
+"""Distill the chatbot's encoder into a smaller student for this knowledge base.
+
+The chatbot only ranks messages against a few dozen fixed answers, so a
+student with 2 of the teacher's 6 transformer layers is usually enough.
+The student starts from a subset of the teacher's layers and is trained to
+reproduce the teacher's embeddings. It is only saved if it picks the same
+knowledge base answer as the teacher on a held-out set of queries.
+
+Usage (needs the training extras: pip install "sentence-transformers[train]"):
+    python distill.py --layers 2 --output models/fashion-minilm-l2
+    MODEL_NAME=models/fashion-minilm-l2 uvicorn main:app
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+from typing import List
+
+import torch
+from sentence_transformers import InputExample, SentenceTransformer, losses
+from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+from torch.utils.data import DataLoader
+
+from knowledge import ENHANCED_FASHION_KNOWLEDGE, FALLBACKS, SAMPLE_QUERIES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Templated variants of common topics, added to SAMPLE_QUERIES for training
+TEMPLATES = [
+    "{}",
+    "tell me about {}",
+    "any tips on {}?",
+    "what do you think about {}?",
+    "ideas for {}",
+]
+TOPICS = [
+    "spring trends", "oversized blazers", "pastel colors", "vintage clothes",
+    "neutral colors", "bold colors", "earthy tones", "statement jewelry",
+    "leather belts", "scarves", "casual outfits", "formal outfits",
+    "business attire", "maxi dresses", "yoga pants", "layering",
+]
+
+def knowledge_texts() -> List[str]:
+    texts = []
+    for items in ENHANCED_FASHION_KNOWLEDGE.values():
+        texts.extend(items if isinstance(items, list) else items.values())
+    return texts
+
+def keep_layers(model: SentenceTransformer, num_layers: int) -> None:
+    """Keep num_layers evenly spaced transformer layers, including the first and last."""
+    auto_model = model[0].auto_model
+    layers = auto_model.encoder.layer
+    keep = torch.linspace(0, len(layers) - 1, num_layers).round().long().tolist()
+    logger.info(f"Keeping layers {keep} of {len(layers)}")
+    auto_model.encoder.layer = torch.nn.ModuleList([layers[i] for i in keep])
+    auto_model.config.num_hidden_layers = num_layers
+
+def best_answers(model: SentenceTransformer, queries: List[str], answers: List[str], max_seq_length: int) -> torch.Tensor:
+    """Index of the closest answer for each query, as the chatbot would rank them.
+
+    Like the API, answers keep the model's full input length and queries are
+    truncated to max_seq_length.
+    """
+    answer_embeddings = model.encode(answers, convert_to_tensor=True, normalize_embeddings=True)
+    full_seq_length = model.max_seq_length
+    model.max_seq_length = max_seq_length
+    try:
+        query_embeddings = model.encode(queries, convert_to_tensor=True, normalize_embeddings=True)
+    finally:
+        model.max_seq_length = full_seq_length
+    return (query_embeddings @ answer_embeddings.T).argmax(dim=1).cpu()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teacher", default="all-MiniLM-L6-v2")
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--output", default="models/fashion-minilm-l2")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of topics and sample queries held out for evaluation")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="required top-1 agreement with the teacher")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--max-seq-length",
+        type=int,
+        default=int(os.getenv("MAX_SEQ_LENGTH", "32")),
+        help="tokens kept per query, as in the API",
+    )
+    args = parser.parse_args()
+    
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    
+    teacher = SentenceTransformer(args.teacher)
+    student = SentenceTransformer(args.teacher)
+    keep_layers(student, args.layers)
+    
+    answers = knowledge_texts() + FALLBACKS
+    # Hold out whole topics, so no templated variant of a held-out topic is
+    # trained on, plus a share of the hand-written queries
+    topics, samples = list(TOPICS), list(SAMPLE_QUERIES)
+    random.shuffle(topics)
+    random.shuffle(samples)
+    num_topics, num_samples = int(len(topics) * args.holdout), int(len(samples) * args.holdout)
+    holdout = samples[:num_samples] + [template.format(topic) for template in TEMPLATES for topic in topics[:num_topics]]
+    train = samples[num_samples:] + [template.format(topic) for template in TEMPLATES for topic in topics[num_topics:]]
+    train += answers
+    
+    # Train the student to reproduce the teacher's embeddings
+    targets = teacher.encode(train, convert_to_numpy=True)
+    examples = [InputExample(texts=[text], label=target) for text, target in zip(train, targets)]
+    loader = DataLoader(examples, shuffle=True, batch_size=16)
+    student.fit(
+        train_objectives=[(loader, losses.MSELoss(model=student))],
+        epochs=args.epochs,
+        warmup_steps=len(loader),
+    )
+    
+    teacher_answers = best_answers(teacher, holdout, answers, args.max_seq_length)
+    student_answers = best_answers(student, holdout, answers, args.max_seq_length)
+    agreement = (teacher_answers == student_answers).float().mean().item()
+    logger.info(f"Student picks the teacher's answer for {agreement:.1%} of {len(holdout)} held-out queries")
+    if agreement < args.min_agreement:
+        logger.error(f"Agreement is below {args.min_agreement:.0%}, not saving the student")
+        return 1
+    
+    student.save(args.output)
+    # Export the same int8 ONNX graph the API loads by default
+    export_dynamic_quantized_onnx_model(SentenceTransformer(args.output, backend="onnx"), "avx512_vnni", args.output)
+    logger.info(f"Saved student to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
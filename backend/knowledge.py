@@ -0,0 +1,80 @@
+"""Fashion knowledge base served by the chatbot."""
+
+# Enhanced fashion knowledge base with more examples
+ENHANCED_FASHION_KNOWLEDGE = {
+    "trends": [
+        "Oversized blazers are in style this season.",
+        "Pastel colors are trending for spring.",
+        "Sustainable fashion is becoming increasingly popular.",
+        "Vintage and retro styles are making a comeback.",
+        "Minimalist and capsule wardrobes are trending for their sustainability.",
+    ],
+    "styles": {
+        "casual": "Casual style is all about comfort and simplicity. Think jeans, t-shirts, and sneakers. It's perfect for everyday wear.",
+        "formal": "Formal wear typically includes suits, dress shirts, formal shoes, and accessories like ties and cufflinks. For women, this could mean elegant dresses or pantsuits.",
+        "business": "Business attire is professional and polished. For men, this means dress shirts, slacks, and blazers. For women, it could be blouses, pencil skirts, or tailored pants.",
+        "bohemian": "Bohemian style features flowy fabrics, earthy tones, and eclectic patterns. Think maxi dresses, fringed vests, and layered jewelry.",
+        "athleisure": "Athleisure combines athletic wear with casual clothing. It includes items like yoga pants, hoodies, and sneakers that are both comfortable and stylish.",
+    },
+    "colors": [
+        "Neutral colors like beige, white, and gray are versatile and timeless.",
+        "Bold colors can make a statement and add personality to your outfit.",
+        "Earthy tones like olive green, terracotta, and mustard are great for a natural look.",
+        "Jewel tones such as emerald, sapphire, and amethyst add richness to any outfit.",
+    ],
+    "accessories": [
+        "Statement jewelry can elevate any outfit.",
+        "A good quality watch is a timeless accessory.",
+        "Scarves can add color and texture to your look.",
+        "A classic leather belt can tie an outfit together.",
+        "Sunglasses are both stylish and practical for sunny days.",
+    ],
+    "outfits": [
+        "For a casual day out, try pairing light wash jeans with a white t-shirt and sneakers.",
+        "A little black dress is perfect for any formal occasion and can be dressed up or down with accessories.",
+        "For a business casual look, pair tailored trousers with a blouse and a blazer.",
+        "Layering is key for transitional weather - try a denim jacket over a summer dress.",
+    ]
+}
+
+# Answers used when nothing in the knowledge base is close enough
+FALLBACKS = [
+    "I'm a fashion assistant. I can help you with fashion trends, styles, colors, and accessories.",
+    "I'm not sure I understand. Could you rephrase your question about fashion?",
+    "I'm here to help with fashion advice. Could you tell me more about what you're looking for?",
+    "I specialize in fashion advice. You can ask me about trends, styles, colors, or outfit ideas."
+]
+
+# Questions in the style users send to /chat
+SAMPLE_QUERIES = [
+    "What's trending this season?",
+    "What are the latest fashion trends?",
+    "Is sustainable fashion still popular?",
+    "Are retro styles coming back?",
+    "What should I wear to a wedding?",
+    "What do I wear for a job interview?",
+    "Outfit ideas for a casual weekend?",
+    "How do I dress for business casual?",
+    "What can I wear when the weather keeps changing?",
+    "Is a little black dress a good choice for a party?",
+    "Which colors never go out of style?",
+    "What colors go well with olive green?",
+    "How do I add some color to my outfit?",
+    "Are jewel tones good for winter?",
+    "What accessories should every wardrobe have?",
+    "Is a watch worth buying?",
+    "How do I wear a scarf?",
+    "What belt goes with jeans?",
+    "Do sunglasses count as an accessory?",
+    "What is bohemian style?",
+    "Tell me about athleisure",
+    "What counts as formal wear?",
+    "What should I wear to the office?",
+    "How do I build a capsule wardrobe?",
+    "What shoes go with a suit?",
+    "Can I wear sneakers with a blazer?",
+    "How do I look more put together?",
+    "What's a good outfit for a first date?",
+    "What should I pack for a beach holiday?",
+    "How can I make a plain t-shirt look stylish?",
+]
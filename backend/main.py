@@ -1,72 +1,361 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Set, Tuple
+from contextlib import asynccontextmanager
+import json
 import logging
-from sentence_transformers import SentenceTransformer, util
+import os
+import re
+import httpx
+from sentence_transformers import SentenceTransformer
+from transformers import PreTrainedTokenizerFast
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import torch
+
+from batching import EmbeddingBatcher, bucket_by_length
+from cache import ResponseCache
+from knowledge import ENHANCED_FASHION_KNOWLEDGE, FALLBACKS
+
+try:
+    import simsimd
+except ImportError:  # optional SIMD kernels, torch is used otherwise
+    simsimd = None
+
+try:
+    import ahocorasick
+except ImportError:  # optional, a compiled regex is used otherwise
+    ahocorasick = None
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Run the batcher's worker on the server's event loop, and stop it with it
+    embedding_batcher.start()
+    yield
+    await embedding_batcher.stop()
+    if tei_async_client is not None:
+        await tei_async_client.aclose()
+
 # Initialize FastAPI app
-app = FastAPI(title="Fashion Chatbot API")
-
-# Initialize the sentence transformer model
-MODEL_NAME = "all-MiniLM-L6-v2"  # Lightweight but effective model
-model = SentenceTransformer(MODEL_NAME)
-
-# Enhanced fashion knowledge base with more examples
-ENHANCED_FASHION_KNOWLEDGE = {
-    "trends": [
-        "Oversized blazers are in style this season.",
-        "Pastel colors are trending for spring.",
-        "Sustainable fashion is becoming increasingly popular.",
-        "Vintage and retro styles are making a comeback.",
-        "Minimalist and capsule wardrobes are trending for their sustainability.",
-    ],
-    "styles": {
-        "casual": "Casual style is all about comfort and simplicity. Think jeans, t-shirts, and sneakers. It's perfect for everyday wear.",
-        "formal": "Formal wear typically includes suits, dress shirts, formal shoes, and accessories like ties and cufflinks. For women, this could mean elegant dresses or pantsuits.",
-        "business": "Business attire is professional and polished. For men, this means dress shirts, slacks, and blazers. For women, it could be blouses, pencil skirts, or tailored pants.",
-        "bohemian": "Bohemian style features flowy fabrics, earthy tones, and eclectic patterns. Think maxi dresses, fringed vests, and layered jewelry.",
-        "athleisure": "Athleisure combines athletic wear with casual clothing. It includes items like yoga pants, hoodies, and sneakers that are both comfortable and stylish.",
-    },
-    "colors": [
-        "Neutral colors like beige, white, and gray are versatile and timeless.",
-        "Bold colors can make a statement and add personality to your outfit.",
-        "Earthy tones like olive green, terracotta, and mustard are great for a natural look.",
-        "Jewel tones such as emerald, sapphire, and amethyst add richness to any outfit.",
-    ],
-    "accessories": [
-        "Statement jewelry can elevate any outfit.",
-        "A good quality watch is a timeless accessory.",
-        "Scarves can add color and texture to your look.",
-        "A classic leather belt can tie an outfit together.",
-        "Sunglasses are both stylish and practical for sunny days.",
-    ],
-    "outfits": [
-        "For a casual day out, try pairing light wash jeans with a white t-shirt and sneakers.",
-        "A little black dress is perfect for any formal occasion and can be dressed up or down with accessories.",
-        "For a business casual look, pair tailored trousers with a blouse and a blazer.",
-        "Layering is key for transitional weather - try a denim jacket over a summer dress.",
+app = FastAPI(title="Fashion Chatbot API", lifespan=lifespan)
+
+# Base URL of a Text Embeddings Inference server (text-embeddings-router
+# --model-id sentence-transformers/all-MiniLM-L6-v2). When set, the encoder
+# runs there and no model is loaded in this process.
+EMBEDDINGS_URL = os.getenv("EMBEDDINGS_URL")
+# Inputs per /embed request; TEI rejects more than its --max-client-batch-size
+TEI_MAX_BATCH_SIZE = int(os.getenv("TEI_MAX_BATCH_SIZE", "32"))
+# Lightweight but effective model; point MODEL_NAME at the output of
+# distill.py to serve the smaller student instead
+MODEL_NAME = os.getenv("MODEL_NAME", "all-MiniLM-L6-v2")
+# Run on the GPU when there is one; all embeddings are kept on this device
+DEVICE = os.getenv("DEVICE", "cuda" if torch.cuda.is_available() else "cpu")
+ON_GPU = torch.device(DEVICE).type == "cuda"
+ON_CPU = torch.device(DEVICE).type == "cpu"
+# "onnx" runs the int8-quantized export shipped on the model hub through
+# ONNX Runtime, whose AVX512-VNNI kernels are tuned for x86 CPUs; on GPU the
+# default is "torch", which runs the fp16 PyTorch weights.
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch" if ON_GPU else "onnx")
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+# Threads per process for the encoder's matmuls. Scale out with
+# `uvicorn main:app --workers N` (N = physical cores / INTRA_OP_THREADS)
+# rather than more threads, since encode holds the GIL.
+INTRA_OP_THREADS = int(os.getenv("INTRA_OP_THREADS", "4"))
+torch.set_num_threads(INTRA_OP_THREADS)
+torch.set_num_interop_threads(1)
+# Weight dtype for the PyTorch backend: fp16 halves memory traffic on GPU.
+# On CPUs with native bf16 support (e.g. Sapphire Rapids, Zen 4) set
+# MODEL_DTYPE=bfloat16; elsewhere bf16 is emulated and slower than fp32.
+MODEL_DTYPE = os.getenv("MODEL_DTYPE", "float16" if ON_GPU else "float32")
+# Chat messages are short, so inputs are truncated well below the model's
+# 256-token default; attention cost grows with the square of this length
+MAX_SEQ_LENGTH = int(os.getenv("MAX_SEQ_LENGTH", "32"))
+# Fuse the PyTorch encoder with BetterTransformer + torch.compile
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "1") == "1"
+
+def warm_up(model: SentenceTransformer, full_seq_length: int) -> None:
+    """Run padded multi-text batches at both the chat and the knowledge base length."""
+    texts = ["warm up", "a longer warm up message that needs padding " * 64]
+    try:
+        for length in (MAX_SEQ_LENGTH, full_seq_length):
+            model.max_seq_length = length
+            model.encode(texts)
+    finally:
+        model.max_seq_length = MAX_SEQ_LENGTH
+
+def compile_encoder(model: SentenceTransformer, full_seq_length: int) -> None:
+    """Swap the Hugging Face encoder for a BetterTransformer, torch.compile'd version.
+
+    Each step is warmed up on the shapes served later (padded batches, short
+    and full length) and dropped again if that fails.
+    """
+    transformer = model[0]
+    eager_model = transformer.auto_model
+    try:
+        transformer.auto_model = eager_model.to_bettertransformer()
+        warm_up(model, full_seq_length)
+    except Exception as e:
+        logger.warning(f"BetterTransformer unavailable ({str(e)}), keeping the stock attention")
+        transformer.auto_model = eager_model
+    fused_model = transformer.auto_model
+    try:
+        transformer.auto_model = torch.compile(fused_model, mode="reduce-overhead", dynamic=True)
+        # Compile now rather than on the first user request
+        warm_up(model, full_seq_length)
+    except Exception as e:
+        logger.warning(f"torch.compile failed ({str(e)}), using the uncompiled model")
+        transformer.auto_model = fused_model
+
+def load_model() -> Tuple[SentenceTransformer, int]:
+    """Load the encoder once at startup, preferring the quantized ONNX graph.
+
+    Also returns the model's own max_seq_length from before the chat
+    message cap is applied.
+    """
+    model = None
+    if MODEL_BACKEND == "onnx":
+        try:
+            import onnxruntime
+            
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = INTRA_OP_THREADS
+            session_options.inter_op_num_threads = 1
+            model = SentenceTransformer(
+                MODEL_NAME,
+                device=DEVICE,
+                backend="onnx",
+                model_kwargs={"file_name": ONNX_MODEL_FILE, "session_options": session_options},
+            )
+        except Exception as e:
+            logger.warning(f"Could not load ONNX model ({str(e)}), falling back to PyTorch")
+    if model is None:
+        model = SentenceTransformer(MODEL_NAME, device=DEVICE, model_kwargs={"torch_dtype": MODEL_DTYPE})
+    
+    full_seq_length = model.max_seq_length
+    model.max_seq_length = MAX_SEQ_LENGTH
+    if not isinstance(model.tokenizer, PreTrainedTokenizerFast):
+        logger.warning("Model has no fast (Rust) tokenizer, tokenization will be slow")
+    if TORCH_COMPILE and model.backend == "torch":
+        compile_encoder(model, full_seq_length)
+    return model, full_seq_length
+
+if EMBEDDINGS_URL:
+    # TEI applies its own input length limit
+    model, KB_MAX_SEQ_LENGTH = None, None
+    tei_client = httpx.Client(base_url=EMBEDDINGS_URL, timeout=10)
+    tei_async_client = httpx.AsyncClient(base_url=EMBEDDINGS_URL, timeout=10)
+    # The model the server actually runs, which MODEL_NAME does not control
+    tei_info = tei_client.get("/info")
+    tei_info.raise_for_status()
+    TEI_MODEL_ID = tei_info.json()["model_id"]
+else:
+    # Initialize the sentence transformer model. Knowledge base answers are
+    # longer and encoded once, so they keep the model's full input length
+    model, KB_MAX_SEQ_LENGTH = load_model()
+    tei_client = tei_async_client = None
+    TEI_MODEL_ID = None
+
+def tei_embeddings(response: httpx.Response) -> torch.Tensor:
+    """Read the embeddings from a TEI /embed response."""
+    response.raise_for_status()
+    return torch.tensor(response.json(), device=DEVICE)
+
+def encode_texts(texts):
+    """Encode a string or list of strings into L2-normalized embeddings.
+
+    With unit-length vectors, cosine similarity reduces to a dot product.
+    Embeddings are returned as float32 whatever dtype the encoder runs in.
+    """
+    if tei_client is not None:
+        inputs = [texts] if isinstance(texts, str) else texts
+        embeddings = torch.cat([
+            tei_embeddings(tei_client.post(
+                "/embed",
+                json={"inputs": inputs[i:i + TEI_MAX_BATCH_SIZE], "normalize": True, "truncate": True},
+            ))
+            for i in range(0, len(inputs), TEI_MAX_BATCH_SIZE)
+        ])
+        return embeddings[0] if isinstance(texts, str) else embeddings
+    return model.encode(texts, device=DEVICE, convert_to_tensor=True, normalize_embeddings=True).float()
+
+async def encode_message(message: str) -> torch.Tensor:
+    """Encode one chat message without blocking the event loop.
+
+    TEI batches concurrent requests itself; the local model goes through
+    the micro-batcher.
+    """
+    if tei_async_client is not None:
+        response = await tei_async_client.post(
+            "/embed", json={"inputs": [message], "normalize": True, "truncate": True}
+        )
+        return tei_embeddings(response)[0]
+    return await embedding_batcher.encode(message)
+
+def encode_full_length(texts: List[str]) -> torch.Tensor:
+    """Encode knowledge base texts without the chat message length cap (startup only)."""
+    if model is None:
+        # TEI applies its own max input length
+        return encode_texts(texts)
+    model.max_seq_length = KB_MAX_SEQ_LENGTH
+    try:
+        return encode_texts(texts)
+    finally:
+        model.max_seq_length = MAX_SEQ_LENGTH
+
+# Upper token-length bound of each bucket used when encoding a batch
+LENGTH_BUCKETS = tuple(b for b in (16, 32, 64) if b < MAX_SEQ_LENGTH) + (MAX_SEQ_LENGTH,)
+
+def encode_bucketed(texts: List[str]) -> torch.Tensor:
+    """Encode a batch in token-length buckets, each padded only to its own longest text.
+
+    Rows are returned in the order of texts.
+    """
+    lengths = [
+        len(ids) for ids in model.tokenizer(texts, truncation=True, max_length=MAX_SEQ_LENGTH)["input_ids"]
     ]
+    buckets = bucket_by_length(lengths, LENGTH_BUCKETS)
+    if len(buckets) == 1:
+        return encode_texts(texts)
+    
+    embeddings = None
+    for indices in buckets.values():
+        bucket_embeddings = encode_texts([texts[i] for i in indices])
+        if embeddings is None:
+            embeddings = bucket_embeddings.new_empty((len(texts), bucket_embeddings.shape[-1]))
+        embeddings[torch.tensor(indices, device=embeddings.device)] = bucket_embeddings
+    return embeddings
+
+# Trigger keywords, matched as substrings of the lowercased message
+GREETING_WORDS = frozenset({"hello", "hi", "hey"})
+TREND_WORDS = frozenset({"trend", "trending"})
+COLOR_WORDS = frozenset({"color", "colors", "colour"})
+ACCESSORY_WORDS = frozenset({"accessory", "accessories"})
+OUTFIT_WORDS = frozenset({"outfit", "wear", "dress"})
+STYLE_NAMES = frozenset(ENHANCED_FASHION_KNOWLEDGE["styles"])
+
+# The tag each keyword reports: "greeting", a knowledge base category or a style name
+KEYWORD_TAGS = {
+    **dict.fromkeys(GREETING_WORDS, "greeting"),
+    **dict.fromkeys(TREND_WORDS, "trends"),
+    **dict.fromkeys(COLOR_WORDS, "colors"),
+    **dict.fromkeys(ACCESSORY_WORDS, "accessories"),
+    **dict.fromkeys(OUTFIT_WORDS, "outfits"),
+    **{style: style for style in STYLE_NAMES},
 }
+# When a message names several categories, the first one listed wins
+CATEGORY_PRIORITY = ("trends", "colors", "accessories", "outfits")
+
+if ahocorasick is not None:
+    KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for keyword, tag in KEYWORD_TAGS.items():
+        KEYWORD_AUTOMATON.add_word(keyword, tag)
+    KEYWORD_AUTOMATON.make_automaton()
+else:
+    # The lookahead reports overlapping matches too, like the substring checks it replaces
+    KEYWORD_PATTERN = re.compile(
+        "(?=(" + "|".join(sorted(map(re.escape, KEYWORD_TAGS), key=len, reverse=True)) + "))"
+    )
 
-# Precompute embeddings for all knowledge base items
-knowledge_embeddings = {}
+def match_keywords(message_lower: str) -> Set[str]:
+    """Scan the message once and return the tags of all trigger keywords it contains."""
+    if ahocorasick is not None:
+        return {tag for _, tag in KEYWORD_AUTOMATON.iter(message_lower)}
+    return {KEYWORD_TAGS[match.group(1)] for match in KEYWORD_PATTERN.finditer(message_lower)}
+
+# Precomputed knowledge base written by build_kb.py
+KB_EMBEDDINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kb.npy")
+KB_METADATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kb.json")
+
+# Flatten the knowledge base into parallel text / category lists; the
+# embeddings are stacked into a single (N, d) matrix in the same order so a
+# query is scored against the whole base in one call
+KB_TEXTS: List[str] = []
+KB_CATEGORIES: List[str] = []
 for category, items in ENHANCED_FASHION_KNOWLEDGE.items():
     if isinstance(items, list):
         texts = items
     else:  # dict
         texts = list(items.values())
-    knowledge_embeddings[category] = {
-        'texts': texts,
-        'embeddings': model.encode(texts, convert_to_tensor=True)
+    KB_TEXTS.extend(texts)
+    KB_CATEGORIES.extend([category] * len(texts))
+
+def knowledge_base_metadata() -> Dict[str, Any]:
+    """Describe what the precomputed embeddings were built from.
+
+    Covers every setting that changes the knowledge base embeddings, so a
+    file built under different settings is never reused.
+    """
+    backend = "tei" if model is None else model.backend
+    return {
+        "model": MODEL_NAME if model is not None else TEI_MODEL_ID,
+        "backend": backend,
+        "onnx_model_file": ONNX_MODEL_FILE if backend == "onnx" else None,
+        "model_dtype": MODEL_DTYPE if backend == "torch" else None,
+        "max_seq_length": MAX_SEQ_LENGTH,
+        "kb_max_seq_length": KB_MAX_SEQ_LENGTH,
+        "texts": KB_TEXTS,
+        "categories": KB_CATEGORIES,
+        "fallbacks": FALLBACKS,
     }
 
+def build_knowledge_base() -> np.ndarray:
+    """Encode the knowledge base texts followed by the fallback answers."""
+    return encode_full_length(KB_TEXTS + FALLBACKS).cpu().numpy()
+
+def load_knowledge_base() -> np.ndarray:
+    """Memory-map the embeddings written by build_kb.py, or encode them if missing or stale."""
+    try:
+        with open(KB_METADATA_FILE) as f:
+            metadata = json.load(f)
+        if metadata == knowledge_base_metadata():
+            embeddings = np.load(KB_EMBEDDINGS_FILE, mmap_mode="r")
+            if embeddings.shape[0] == len(KB_TEXTS) + len(FALLBACKS):
+                return embeddings
+        logger.warning(f"{KB_METADATA_FILE} does not match the current settings and knowledge base, re-encoding")
+    except FileNotFoundError:
+        logger.info("No precomputed knowledge base found, encoding it (run build_kb.py to skip this)")
+    except (OSError, EOFError, ValueError) as e:
+        logger.warning(f"Could not read the precomputed knowledge base ({str(e)}), re-encoding")
+    return build_knowledge_base()
+
+# Stored embeddings (knowledge base and semantic cache) are kept in fp16 on
+# GPU, halving the memory read per similarity scan with no effect on the
+# ranking. CPU half-precision matmuls are slow, and there the SimSIMD int8
+# copy below is the compact one.
+EMBEDDING_DTYPE = torch.float16 if ON_GPU else torch.float32
+
+kb_embeddings = load_knowledge_base()
+KB_EMBEDDINGS = torch.tensor(kb_embeddings[:len(KB_TEXTS)], device=DEVICE, dtype=EMBEDDING_DTYPE)
+
+def quantize_int8(embeddings: np.ndarray) -> np.ndarray:
+    """Scale each row into the int8 range; cosine similarity ignores the per-row scale."""
+    scales = np.maximum(np.abs(embeddings).max(axis=-1, keepdims=True), 1e-12) / 127
+    return np.ascontiguousarray(np.round(embeddings / scales), dtype=np.int8)
+
+# int8 copy of the knowledge base for the SimSIMD cosine kernels, which run
+# on the host; on any accelerator the matmul stays on the device instead
+KB_INT8 = quantize_int8(kb_embeddings[:len(KB_TEXTS)]) if simsimd is not None and ON_CPU else None
+# Row indices of each category, used to restrict the search to one category
+KB_CATEGORY_INDICES = {
+    category: torch.tensor([i for i, cat in enumerate(KB_CATEGORIES) if cat == category], device=DEVICE)
+    for category in ENHANCED_FASHION_KNOWLEDGE
+}
+
+# Fallback answers are stored after the knowledge base rows
+FALLBACK_EMBEDDINGS = torch.tensor(kb_embeddings[len(KB_TEXTS):], device=DEVICE)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, EMBEDDING_DTYPE)
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+embedding_batcher = EmbeddingBatcher(encode_bucketed, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS / 1000)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -95,60 +384,94 @@ class ChatResponse(BaseModel):
 
 # Using ENHANCED_FASHION_KNOWLEDGE instead of FASHION_KNOWLEDGE
 
-def find_most_relevant_response(message: str, category: str = None) -> Tuple[str, float]:
-    """Find the most relevant response from the knowledge base using semantic search."""
-    # Encode the input message
-    message_embedding = model.encode(message, convert_to_tensor=True)
+def find_most_relevant_response(
+    message: str, category: str = None, message_embedding: Optional[torch.Tensor] = None
+) -> Tuple[str, float, Any]:
+    """Find the most relevant response from the knowledge base using semantic search.
+
+    The message embedding is returned as well so callers can reuse it.
+    """
+    # Encode the input message unless the caller already did
+    if message_embedding is None:
+        message_embedding = encode_texts(message)
     
-    best_score = -1
-    best_response = None
+    if KB_INT8 is not None:
+        query = quantize_int8(message_embedding.cpu().numpy()[None, :])
+        distances = np.asarray(simsimd.cdist(query, KB_INT8, metric="cosine"))[0]
+        similarities = torch.from_numpy(1 - distances)
+    else:
+        similarities = (KB_EMBEDDINGS @ message_embedding.to(EMBEDDING_DTYPE)).float()
     
     # If category is specified, only search in that category
-    categories_to_search = [category] if category else knowledge_embeddings.keys()
+    if category:
+        if category not in KB_CATEGORY_INDICES:
+            return None, -1, message_embedding
+        indices = KB_CATEGORY_INDICES[category]
+        similarities = similarities[indices]
+    else:
+        indices = None
     
-    for cat in categories_to_search:
-        if cat not in knowledge_embeddings:
-            continue
-            
-        # Calculate cosine similarity
-        similarities = util.cos_sim(
-            message_embedding.unsqueeze(0),
-            knowledge_embeddings[cat]['embeddings']
-        )[0]
-        
-        # Get the index of the highest similarity score
-        max_idx = similarities.argmax().item()
-        max_score = similarities[max_idx].item()
-        
-        if max_score > best_score:
-            best_score = max_score
-            best_response = knowledge_embeddings[cat]['texts'][max_idx]
+    # Get the index of the highest similarity score, staying on the device
+    # until the final lookup
+    best_score, max_idx = similarities.max(dim=0)
+    if indices is not None:
+        max_idx = indices[max_idx]
+    # One host sync for both values; row indices are exact in float32
+    best_score, max_idx = torch.stack((best_score, max_idx.to(best_score.dtype))).tolist()
+    best_response = KB_TEXTS[int(max_idx)]
     
-    return best_response, best_score
+    return best_response, best_score, message_embedding
 
-def generate_response(message: str, chat_history: List[Dict[str, str]] = None) -> str:
-    """Generate a response using semantic similarity with the knowledge base."""
+def detect_category(keywords: Set[str]) -> Optional[str]:
+    """Return the knowledge base category named by the matched keywords, if any."""
+    return next((category for category in CATEGORY_PRIORITY if category in keywords), None)
+
+def quick_response(message: str) -> Optional[str]:
+    """Answer without the encoder if possible: empty messages, greetings and cache hits."""
     if not message.strip():
         return "I didn't receive any message. Could you please ask me something about fashion?"
     
     # Check for greetings
     message_lower = message.lower()
-    if any(word in message_lower for word in ["hello", "hi", "hey"]):
+    keywords = match_keywords(message_lower)
+    if "greeting" in keywords:
         return "Hello! I'm your fashion assistant. How can I help you with fashion today?"
     
+    # A message naming exactly one style and no other category needs no search
+    if detect_category(keywords) is None:
+        styles = keywords & STYLE_NAMES
+        if len(styles) == 1:
+            return ENHANCED_FASHION_KNOWLEDGE["styles"][next(iter(styles))]
+    
+    # Serve repeated messages straight from the cache
+    return response_cache.get(" ".join(message_lower.split()))
+
+def respond_to_embedding(message: str, message_embedding: torch.Tensor) -> str:
+    """Answer an encoded message and remember the answer in the response cache."""
+    message_lower = message.lower()
+    keywords = match_keywords(message_lower)
+    
     # Check for specific categories
-    category = None
-    if any(word in message_lower for word in ["trend", "trending"]):
-        category = "trends"
-    elif any(word in message_lower for word in ["color", "colors", "colour"]):
-        category = "colors"
-    elif any(word in message_lower for word in ["accessory", "accessories"]):
-        category = "accessories"
-    elif any(word in message_lower for word in ["outfit", "wear", "dress"]):
-        category = "outfits"
+    category = detect_category(keywords)
     
+    # Paraphrases of an earlier message get the same answer
+    response = response_cache.get_similar(message_embedding)
+    if response is None:
+        response = select_response(message, keywords, category, message_embedding)
+    response_cache.put(" ".join(message_lower.split()), message_embedding, response)
+    return response
+
+def generate_response(message: str, chat_history: List[Dict[str, str]] = None) -> str:
+    """Generate a response using semantic similarity with the knowledge base."""
+    response = quick_response(message)
+    if response is None:
+        response = respond_to_embedding(message, encode_texts(message))
+    return response
+
+def select_response(message: str, keywords: Set[str], category: Optional[str], message_embedding: torch.Tensor) -> str:
+    """Pick the knowledge base answer, style description or fallback for an encoded message."""
     # Find the most relevant response
-    best_response, score = find_most_relevant_response(message, category)
+    best_response, score, _ = find_most_relevant_response(message, category, message_embedding)
     
     # If we found a good match, return it
     if best_response and score > 0.3:  # Threshold can be adjusted
@@ -160,43 +483,33 @@ def generate_response(message: str, chat_history: List[Dict[str, str]] = None) -
     # Check for style-related questions
     if not category:
         for style in ENHANCED_FASHION_KNOWLEDGE["styles"]:
-            if style in message_lower:
+            if style in keywords:
                 return ENHANCED_FASHION_KNOWLEDGE["styles"][style]
     
-    # Fallback responses
-    fallbacks = [
-        "I'm a fashion assistant. I can help you with fashion trends, styles, colors, and accessories.",
-        "I'm not sure I understand. Could you rephrase your question about fashion?",
-        "I'm here to help with fashion advice. Could you tell me more about what you're looking for?",
-        "I specialize in fashion advice. You can ask me about trends, styles, colors, or outfit ideas."
-    ]
-    
     # Use the message embedding to select a fallback
-    message_embedding = model.encode(message, convert_to_tensor=True)
-    fallback_embeddings = model.encode(fallbacks, convert_to_tensor=True)
-    similarities = util.cos_sim(message_embedding.unsqueeze(0), fallback_embeddings)[0]
+    similarities = FALLBACK_EMBEDDINGS @ message_embedding
     best_fallback_idx = similarities.argmax().item()
     
-    return fallbacks[best_fallback_idx]
+    return FALLBACKS[best_fallback_idx]
 
 def fallback_response(message: str) -> str:
     """Fallback to keyword-based response if model fails."""
-    message_lower = message.lower()
+    keywords = match_keywords(message.lower())
     
-    if any(word in message_lower for word in ["trend", "trending"]):
+    if "trends" in keywords:
         return "Here are some current fashion trends: " + " | ".join(ENHANCED_FASHION_KNOWLEDGE["trends"])
     
     for style in ENHANCED_FASHION_KNOWLEDGE["styles"]:
-        if style in message_lower:
+        if style in keywords:
             return ENHANCED_FASHION_KNOWLEDGE["styles"][style]
     
-    if any(word in message_lower for word in ["color", "colors", "colour"]):
+    if "colors" in keywords:
         return " ".join(ENHANCED_FASHION_KNOWLEDGE["colors"])
     
-    if any(word in message_lower for word in ["accessory", "accessories"]):
+    if "accessories" in keywords:
         return " ".join(ENHANCED_FASHION_KNOWLEDGE["accessories"])
     
-    if any(word in message_lower for word in ["outfit", "wear", "dress"]):
+    if "outfits" in keywords:
         return "Here are some outfit ideas: " + " | ".join(ENHANCED_FASHION_KNOWLEDGE["outfits"])
     
     return "I'm a fashion assistant. I can help you with fashion trends, styles, colors, and accessories."
@@ -215,8 +528,12 @@ async def chat(chat_request: ChatRequest):
         logger.info(f"Received message: {user_message}")
         logger.debug(f"Chat history length: {len(chat_history)}")
         
-        # Generate response using the model
-        bot_response = generate_response(user_message, chat_history)
+        # Generate response using the model, batching the encoder call
+        # with other in-flight requests
+        bot_response = quick_response(user_message)
+        if bot_response is None:
+            message_embedding = await encode_message(user_message)
+            bot_response = respond_to_embedding(user_message, message_embedding)
         
         # Log the response for debugging
         logger.info(f"Generated response: {bot_response[:100]}..." if len(bot_response) > 100 else f"Generated response: {bot_response}")
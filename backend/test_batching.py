@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from batching import EmbeddingBatcher, bucket_by_length
+
+def test_bucket_by_length():
+    buckets = bucket_by_length([3, 20, 16, 32, 1], (16, 32))
+    assert buckets == {16: [0, 2, 4], 32: [1, 3]}
+
+def test_concurrent_encodes_return_in_order():
+    batches = []
+
+    def encode_batch(texts):
+        batches.append(texts)
+        return [text.upper() for text in texts]
+
+    async def run():
+        batcher = EmbeddingBatcher(encode_batch, max_batch_size=3, max_wait=0.05)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.encode(f"message {i}") for i in range(7)))
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()) == [f"MESSAGE {i}" for i in range(7)]
+    assert sorted(text for batch in batches for text in batch) == sorted(f"message {i}" for i in range(7))
+    assert max(len(batch) for batch in batches) == 3
+
+def test_encode_error_reaches_every_waiter():
+    def encode_batch(texts):
+        raise RuntimeError("encoder failed")
+
+    async def run():
+        batcher = EmbeddingBatcher(encode_batch, max_batch_size=8, max_wait=0.05)
+        try:
+            return await asyncio.gather(*(batcher.encode(str(i)) for i in range(4)), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = asyncio.run(run())
+    assert len(results) == 4
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_restarts_on_a_new_event_loop():
+    batcher = EmbeddingBatcher(lambda texts: list(texts), max_batch_size=4, max_wait=0.01)
+    # Each asyncio.run is a new loop; the worker left on the first one is dead
+    assert asyncio.run(batcher.encode("first")) == "first"
+    assert asyncio.run(batcher.encode("second")) == "second"
+
+def test_encode_bucketed_matches_unbucketed():
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("sentence_transformers")
+    import main
+    if main.model is None:
+        pytest.skip("encoding is offloaded to a TEI server")
+
+    texts = ["hi", "what colors go well with navy for a summer wedding outfit " * 3, "casual style", "trends"]
+    bucketed = main.encode_bucketed(texts)
+    for text, embedding in zip(texts, bucketed):
+        assert torch.allclose(embedding, main.encode_texts([text])[0], atol=1e-4)
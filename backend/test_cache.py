@@ -0,0 +1,39 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from cache import ResponseCache
+
+def unit(*values):
+    return torch.nn.functional.normalize(torch.tensor(values, dtype=torch.float32), dim=0)
+
+def test_exact_hit():
+    cache = ResponseCache(maxsize=2, threshold=0.95)
+    cache.put("what is trending", unit(1, 0, 0), "trends")
+    assert cache.get("what is trending") == "trends"
+    assert cache.get("something else") is None
+
+def test_evicts_least_recently_used():
+    cache = ResponseCache(maxsize=2, threshold=0.95)
+    cache.put("a", unit(1, 0, 0), "answer a")
+    cache.put("b", unit(0, 1, 0), "answer b")
+    # Touching "a" makes "b" the least recently used entry
+    assert cache.get("a") == "answer a"
+    cache.put("c", unit(0, 0, 1), "answer c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "answer a"
+    assert cache.get("c") == "answer c"
+    # The evicted slot no longer answers semantic lookups either
+    assert cache.get_similar(unit(0, 1, 0)) is None
+
+def test_semantic_hit_above_threshold():
+    cache = ResponseCache(maxsize=4, threshold=0.95)
+    cache.put("what colors are in", unit(1, 0, 0), "colors")
+    assert cache.get_similar(unit(1, 0.1, 0)) == "colors"
+    assert cache.get_similar(unit(1, 1, 0)) is None
+
+def test_zero_size_disables_cache():
+    cache = ResponseCache(maxsize=0, threshold=0.95)
+    cache.put("a", unit(1, 0, 0), "answer a")
+    assert cache.get("a") is None
+    assert cache.get_similar(unit(1, 0, 0)) is None
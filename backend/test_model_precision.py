@@ -0,0 +1,63 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+from sentence_transformers import SentenceTransformer
+
+import main
+from knowledge import SAMPLE_QUERIES
+
+# Score thresholds select_response compares the best answer against
+THRESHOLDS = (0.3, 0.5)
+# How far a reduced-precision encoder may move a cosine score. Queries whose
+# two best float32 answers, or whose best score and a threshold, are closer
+# than this are near ties that are not checked
+MARGINS = {"float16": 0.01, "bfloat16": 0.03, "onnx-int8": 0.05}
+
+def load_torch(torch_dtype, device):
+    return SentenceTransformer(main.MODEL_NAME, device=device, model_kwargs={"torch_dtype": torch_dtype})
+
+def load_float16():
+    if not torch.cuda.is_available():
+        pytest.skip("float16 weights are only used on GPU")
+    return load_torch(torch.float16, "cuda")
+
+def load_bfloat16():
+    return load_torch(torch.bfloat16, "cpu")
+
+def load_onnx_int8():
+    pytest.importorskip("onnxruntime")
+    return SentenceTransformer(
+        main.MODEL_NAME, device="cpu", backend="onnx", model_kwargs={"file_name": main.ONNX_MODEL_FILE}
+    )
+
+def score_matrix(model):
+    """Sample query x knowledge base scores, encoded at the lengths the API uses."""
+    answers = model.encode(main.KB_TEXTS, convert_to_tensor=True, normalize_embeddings=True)
+    model.max_seq_length = main.MAX_SEQ_LENGTH
+    queries = model.encode(SAMPLE_QUERIES, convert_to_tensor=True, normalize_embeddings=True)
+    return (queries.float() @ answers.float().T).cpu()
+
+@pytest.fixture(scope="module")
+def reference():
+    return score_matrix(load_torch(torch.float32, "cpu"))
+
+@pytest.mark.parametrize(
+    "precision, load",
+    [("float16", load_float16), ("bfloat16", load_bfloat16), ("onnx-int8", load_onnx_int8)],
+)
+def test_reduced_precision_keeps_answers_and_thresholds(reference, precision, load):
+    margin = MARGINS[precision]
+    scores = score_matrix(load())
+    top_scores, top_indices = reference.topk(2, dim=1)
+    best_scores, best_indices = scores.max(dim=1)
+
+    clear = top_scores[:, 0] - top_scores[:, 1] >= margin
+    # Guard against the margin quietly excluding most of the queries
+    assert clear.sum() >= len(SAMPLE_QUERIES) // 2
+    assert torch.equal(best_indices[clear], top_indices[clear, 0])
+
+    for threshold in THRESHOLDS:
+        clear = (top_scores[:, 0] - threshold).abs() >= margin
+        assert torch.equal(best_scores[clear] > threshold, top_scores[clear, 0] > threshold)
@@ -0,0 +1,31 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+import main
+from build_kb import ranking_agreement
+from knowledge import SAMPLE_QUERIES
+
+# Rounding 384-dim unit vectors to fp16 or per-row int8 moves a cosine score
+# by well under 0.005; queries whose two best float32 answers are closer
+# than this are near ties either precision may flip, so they are not checked
+TIE_MARGIN = 0.01
+
+def use_float16(monkeypatch):
+    kb = main.kb_embeddings[:len(main.KB_TEXTS)]
+    monkeypatch.setattr(main, "KB_INT8", None)
+    monkeypatch.setattr(main, "EMBEDDING_DTYPE", torch.float16)
+    monkeypatch.setattr(main, "KB_EMBEDDINGS", torch.tensor(kb, device=main.DEVICE, dtype=torch.float16))
+
+def use_int8(monkeypatch):
+    pytest.importorskip("simsimd")
+    monkeypatch.setattr(main, "KB_INT8", main.quantize_int8(main.kb_embeddings[:len(main.KB_TEXTS)]))
+
+@pytest.mark.parametrize("use_precision", [use_float16, use_int8], ids=["float16", "int8"])
+def test_reduced_precision_keeps_best_answer(monkeypatch, use_precision):
+    use_precision(monkeypatch)
+    agreeing, checked = ranking_agreement(main.kb_embeddings, TIE_MARGIN)
+    # Guard against the margin quietly excluding most of the queries
+    assert checked >= len(SAMPLE_QUERIES) // 2
+    assert agreeing == checked